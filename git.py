@@ -8,13 +8,121 @@ import os
 import sys
 import json
 import base64
+import random
+import asyncio
 import getpass
+import time
+import re
+import fnmatch
+import shelve
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
-import requests
+from typing import List, Dict, Optional, Set, Tuple, Iterator, AsyncIterator, NamedTuple, Pattern
+import aiohttp
 from datetime import datetime
 
+try:
+    import aiofiles
+except ImportError:
+    aiofiles = None  # Fall back to reading through the thread pool
+
+# ETags of remote files are kept per user, never in the directory being uploaded
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "github-file-pusher"
+ETAG_CACHE_FILE = str(CACHE_DIR / "etags")
+
+# Files smaller than this are base64-encoded on the event loop thread
+PROCESS_POOL_THRESHOLD = 64 * 1024
+
+# Blobs at least this large are streamed to GitHub instead of built in memory
+STREAM_THRESHOLD = 1024 * 1024
+
+# 57KB of input encodes to exactly 76KB of base64, so chunks join without padding
+B64_CHUNK_SIZE = 57 * 1024
+
+# Directories that are never uploaded; their subtrees are not scanned at all.
+# .github is skipped because pushing workflow files needs the token's workflow scope
+EXCLUDE_DIRS = {'.git', '.github', '__pycache__', 'node_modules', '.venv', 'venv'}
+
+EXCLUDE_FILE_PATTERNS = [
+    '*.pyc', '*.pyo', '*.pyd',
+    '.DS_Store', 'Thumbs.db', '*.log', '*.tmp',
+    # Environment files usually hold secrets: .env, .env.local, .envrc, prod.env, ...
+    '.env', '.env.*', '.envrc', '*.env',
+    '*.db', '*.sqlite', '*.sqlite3'
+]
+
+# GitHub's messages for uploads of existing files without a (current) SHA
+SHA_ERROR_RE = re.compile(r'sha.*(?:required|supplied)|does not match', re.IGNORECASE)
+
+def b64_chunks(file_path: str, chunk_size: int = B64_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a file in chunks and yield each chunk base64-encoded"""
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield base64.b64encode(chunk)
+
+def encode_file(file_path: str) -> bytearray:
+    """Base64-encode a file without holding its raw content in memory"""
+    encoded = bytearray()
+    for chunk in b64_chunks(file_path):
+        encoded += chunk
+    return encoded
+
+def blake2b_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file's content with BLAKE2b, reading it in chunks"""
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def compile_patterns(patterns: List[str]) -> Pattern:
+    """Combine glob patterns into a single regex matched against file names"""
+    if not patterns:
+        return re.compile(r'(?!)')  # Matches nothing
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+# Fetches only the repository fields the script uses, 100 per page
+REPOSITORIES_QUERY = """
+query($cursor: String) {
+  viewer {
+    repositories(
+      first: 100, after: $cursor,
+      orderBy: {field: UPDATED_AT, direction: DESC},
+      affiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER],
+      ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]
+    ) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name nameWithOwner isPrivate updatedAt description url defaultBranchRef { name } }
+    }
+  }
+}
+"""
+
+class LocalFile(NamedTuple):
+    """A file found by the local scan, with the stat data captured during the walk"""
+    path: Path
+    size: int
+    inode: int
+
+# Default exclude patterns, compiled once at import
+EXCLUDE_RE = compile_patterns(EXCLUDE_FILE_PATTERNS)
+
 class GitHubPusher:
+    # Concurrent uploads are capped to stay under GitHub's secondary rate limit
+    MAX_CONCURRENT_UPLOADS = 16
+    MAX_RETRIES = 5
+    BACKOFF_FACTOR = 0.3
+    MAX_BACKOFF = 60
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
     def __init__(self, token: str = None):
         self.token = token
         self.base_url = "https://api.github.com"
@@ -24,51 +132,144 @@ class GitHubPusher:
         }
         if self.token:
             self.headers["Authorization"] = f"token {self.token}"
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Blob SHAs of files uploaded in this run, keyed by (repo, path)
+        self._sha_cache: Dict[Tuple[str, str], str] = {}
+        # ETags and SHAs of remote files, kept across runs; opened on first use
+        self._etag_cache: Optional[shelve.Shelf] = None
+        # File reads run in threads, base64 encoding of large files in processes
+        self._io_pool = ThreadPoolExecutor(max_workers=16)
+        self._cpu_pool: Optional[ProcessPoolExecutor] = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=64, limit_per_host=64, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=120, connect=10)
+            )
+        return self.session
+    
+    async def close(self):
+        """Close the shared HTTP session and persist the ETag cache"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        if self._etag_cache is not None:
+            self._etag_cache.close()
+            self._etag_cache = None
+        self._io_pool.shutdown(wait=False)
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False)
+            self._cpu_pool = None
+    
+    def _should_retry(self, response: aiohttp.ClientResponse, data) -> bool:
+        """Check if a response is a transient failure worth retrying"""
+        if response.status == 403:
+            # 403 is only transient when it comes from the rate limiter
+            message = data.get('message', '') if isinstance(data, dict) else ''
+            return response.headers.get('X-RateLimit-Remaining') == '0' or 'rate limit' in message.lower()
+        return response.status in self.RETRY_STATUSES
     
-    def authenticate(self) -> bool:
+    def _backoff_delay(self, attempt: int, response: aiohttp.ClientResponse = None) -> float:
+        """Get the delay before the next retry, honouring GitHub's rate limit headers"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(int(retry_after), self.MAX_BACKOFF)
+            reset = response.headers.get('X-RateLimit-Reset')
+            if response.headers.get('X-RateLimit-Remaining') == '0' and reset and reset.isdigit():
+                return min(max(int(reset) - time.time(), 0), self.MAX_BACKOFF)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.BACKOFF_FACTOR * (2 ** attempt), self.MAX_BACKOFF))
+    
+    async def _request(self, method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+        """Send a request, retrying with exponential backoff on rate limits and server errors
+
+        A callable passed as data is called on every attempt to build a fresh streamed body.
+        """
+        session = self._get_session()
+        for attempt in range(self.MAX_RETRIES + 1):
+            request_kwargs = dict(kwargs)
+            if callable(request_kwargs.get('data')):
+                # Streamed bodies can only be sent once, so build a fresh one per attempt
+                request_kwargs['data'] = request_kwargs['data']()
+            try:
+                async with session.request(method, url, **request_kwargs) as response:
+                    # Read the body so it stays available after the connection is released
+                    await response.read()
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = None
+                    if attempt == self.MAX_RETRIES or not self._should_retry(response, data):
+                        return response
+                delay = self._backoff_delay(attempt, response)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                # Dropped keep-alive connections and timeouts are retried like server errors
+                if attempt == self.MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+            await asyncio.sleep(delay)
+    
+    async def authenticate(self) -> bool:
         """Test authentication with GitHub"""
         try:
-            response = requests.get(f"{self.base_url}/user", headers=self.headers)
-            if response.status_code == 200:
-                user_data = response.json()
+            response = await self._request("GET", f"{self.base_url}/user")
+            if response.status == 200:
+                user_data = await response.json()
                 print(f"✅ Successfully authenticated as: {user_data['login']}")
                 return True
             else:
-                print(f"❌ Authentication failed: {response.status_code}")
+                print(f"❌ Authentication failed: {response.status}")
                 return False
         except Exception as e:
             print(f"❌ Authentication error: {e}")
             return False
     
-    def get_repositories(self) -> List[Dict]:
+    async def get_repositories(self) -> List[Dict]:
         """Get list of user repositories"""
         try:
             repos = []
-            page = 1
-            per_page = 100
+            cursor = None
             
             while True:
-                response = requests.get(
-                    f"{self.base_url}/user/repos",
-                    headers=self.headers,
-                    params={
-                        "page": page,
-                        "per_page": per_page,
-                        "sort": "updated",
-                        "type": "all"
-                    }
+                response = await self._request(
+                    "POST",
+                    f"{self.base_url}/graphql",
+                    json={"query": REPOSITORIES_QUERY, "variables": {"cursor": cursor}}
                 )
                 
-                if response.status_code != 200:
-                    print(f"❌ Failed to get repositories: {response.status_code}")
+                if response.status != 200:
+                    print(f"❌ Failed to get repositories: {response.status}")
                     return []
                 
-                page_repos = response.json()
-                if not page_repos:
-                    break
+                data = await response.json()
+                if data.get('errors'):
+                    print(f"❌ Failed to get repositories: {data['errors'][0].get('message', 'Unknown error')}")
+                    return []
+                
+                page = data['data']['viewer']['repositories']
+                # Map to the REST field names the rest of the script uses
+                repos.extend({
+                    'name': node['name'],
+                    'full_name': node['nameWithOwner'],
+                    'private': node['isPrivate'],
+                    'updated_at': node['updatedAt'],
+                    'description': node['description'],
+                    'default_branch': (node['defaultBranchRef'] or {}).get('name', 'main'),
+                    'html_url': node['url']
+                } for node in page['nodes'])
                 
-                repos.extend(page_repos)
-                page += 1
+                if not page['pageInfo']['hasNextPage']:
+                    break
+                cursor = page['pageInfo']['endCursor']
             
             return repos
         except Exception as e:
@@ -107,96 +308,177 @@ class GitHubPusher:
             except ValueError:
                 print("❌ Please enter a valid number")
     
-    def get_local_files(self, exclude_patterns: List[str] = None) -> List[Path]:
+    def _walk(self, root: str, exclude_dirs: Set[str], exclude_re: Pattern, prefix: str = "") -> Iterator[Tuple[str, int, int]]:
+        """Yield (relative path, size, inode) of files under root, pruning excluded directories"""
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Skip the whole subtree instead of walking into it
+                        if entry.name in exclude_dirs or exclude_re.match(entry.name):
+                            continue
+                        yield from self._walk(entry.path, exclude_dirs, exclude_re, prefix + entry.name + os.sep)
+                    elif entry.is_file() and not exclude_re.match(entry.name):
+                        yield prefix + entry.name, entry.stat().st_size, entry.inode()
+        except OSError as e:
+            print(f"⚠️ Warning: Could not scan {root}: {e}")
+    
+    def get_local_files(self, exclude_patterns: List[str] = None) -> List[LocalFile]:
         """Get list of files in current directory"""
         if exclude_patterns is None:
-            exclude_patterns = [
-                '.git', '__pycache__', '.pyc', '.pyo', '.pyd',
-                '.DS_Store', 'Thumbs.db', '*.log', '*.tmp',
-                'node_modules', '.env', '.venv', 'venv',
-                '*.db', '*.sqlite', '*.sqlite3'
-            ]
-        
-        current_dir = Path.cwd()
-        files = []
+            exclude_dirs = EXCLUDE_DIRS
+            exclude_re = EXCLUDE_RE
+        else:
+            # Custom patterns apply to both file and directory names
+            exclude_dirs = set()
+            exclude_re = compile_patterns(exclude_patterns)
         
-        for file_path in current_dir.rglob('*'):
-            if file_path.is_file():
-                # Check if file should be excluded
-                should_exclude = False
-                for pattern in exclude_patterns:
-                    if pattern in str(file_path) or file_path.name.endswith(pattern.replace('*', '')):
-                        should_exclude = True
-                        break
-                
-                if not should_exclude:
-                    files.append(file_path.relative_to(current_dir))
+        return [
+            LocalFile(Path(file_path), size, inode)
+            for file_path, size, inode in sorted(self._walk(os.getcwd(), exclude_dirs, exclude_re))
+        ]
+    
+    def _get_cpu_pool(self) -> ProcessPoolExecutor:
+        """Get the process pool used for encoding large files, creating it on first use"""
+        if self._cpu_pool is None:
+            self._cpu_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return self._cpu_pool
+    
+    async def _read_encoded(self, file_path: Path, file_size: int = None) -> Optional[str]:
+        """Read a file and return its base64-encoded content without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        try:
+            if file_size is None:
+                file_size = Path(file_path).stat().st_size
+            if file_size >= PROCESS_POOL_THRESHOLD:
+                # Large files are read and encoded chunk by chunk in a worker process
+                encoded_content = await loop.run_in_executor(self._get_cpu_pool(), encode_file, str(file_path))
+                return encoded_content.decode('utf-8')
+            
+            # Shipping small files to another process costs more than encoding them here
+            if aiofiles is not None:
+                async with aiofiles.open(file_path, 'rb') as f:
+                    content = await f.read()
+            else:
+                content = await loop.run_in_executor(self._io_pool, Path.read_bytes, Path(file_path))
+        except Exception as e:
+            print(f"❌ Could not read file {file_path}: {e}")
+            return None
         
-        return sorted(files)
+        return base64.b64encode(content).decode('utf-8')
+    
+    async def _stream_blob_body(self, file_path: Path) -> AsyncIterator[bytes]:
+        """Yield a blob request body, base64-encoding the file one chunk at a time"""
+        loop = asyncio.get_running_loop()
+        yield b'{"encoding": "base64", "content": "'
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = await loop.run_in_executor(self._io_pool, f.read, B64_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield b'"}'
     
-    def file_exists_in_repo(self, repo_name: str, file_path: str, branch: str = "main") -> Optional[Dict]:
+    def _get_etag_cache(self) -> shelve.Shelf:
+        """Get the persistent ETag cache, opening it on first use"""
+        if self._etag_cache is None:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            self._etag_cache = shelve.open(ETAG_CACHE_FILE)
+        return self._etag_cache
+    
+    async def file_exists_in_repo(self, repo_name: str, file_path: str, branch: str = "main") -> Optional[Dict]:
         """Check if file exists in repository and get its SHA"""
         try:
             url = f"{self.base_url}/repos/{repo_name}/contents/{file_path}"
-            response = requests.get(url, headers=self.headers, params={"ref": branch})
+            cache_key = f"{repo_name}:{branch}:{file_path}"
+            etag_cache = self._get_etag_cache()
+            cached = etag_cache.get(cache_key)
+            
+            # A conditional request answered with 304 does not count against the rate limit
+            headers = {"If-None-Match": cached["etag"]} if cached else None
+            response = await self._request("GET", url, params={"ref": branch}, headers=headers)
             
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
+            if response.status == 304 and cached:
+                return {"sha": cached["sha"]}
+            elif response.status == 200:
+                file_info = await response.json()
+                if "ETag" in response.headers and isinstance(file_info, dict):
+                    etag_cache[cache_key] = {"etag": response.headers["ETag"], "sha": file_info["sha"]}
+                return file_info
+            elif response.status == 404:
+                etag_cache.pop(cache_key, None)
                 return None
             else:
-                print(f"⚠️ Warning: Could not check file {file_path}: {response.status_code}")
+                print(f"⚠️ Warning: Could not check file {file_path}: {response.status}")
                 return None
         except Exception as e:
             print(f"⚠️ Warning: Error checking file {file_path}: {e}")
             return None
     
-    def upload_file(self, repo_name: str, file_path: Path, commit_message: str = None, branch: str = "main") -> bool:
+    async def _is_sha_error(self, response: aiohttp.ClientResponse) -> bool:
+        """Check if an upload was rejected because the file's SHA was missing or stale"""
+        try:
+            error_info = await response.json()
+        except ValueError:
+            return False
+        if not isinstance(error_info, dict):
+            return False
+        return bool(SHA_ERROR_RE.search(str(error_info.get('message', ''))))
+    
+    async def _put_contents(self, url: str, data: Dict) -> aiohttp.ClientResponse:
+        """PUT a Contents API upload, retrying 409s caused by concurrent commits to the branch"""
+        response = await self._request("PUT", url, json=data)
+        # A stale or missing SHA also returns 409; the caller handles that, so only branch-head races are retried
+        for attempt in range(self.MAX_RETRIES):
+            if response.status != 409 or await self._is_sha_error(response):
+                break
+            await asyncio.sleep(self._backoff_delay(attempt, response))
+            response = await self._request("PUT", url, json=data)
+        return response
+    
+    async def upload_file(self, repo_name: str, file_path: Path, commit_message: str = None, branch: str = "main",
+                          file_size: int = None) -> bool:
         """Upload a single file to repository"""
         try:
-            # Read file content
-            try:
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-            except Exception as e:
-                print(f"❌ Could not read file {file_path}: {e}")
+            # Read and encode file content
+            encoded_content = await self._read_encoded(file_path, file_size)
+            if encoded_content is None:
                 return False
             
-            # Encode content
-            encoded_content = base64.b64encode(content).decode('utf-8')
-            
-            # Check if file already exists
             file_path_str = str(file_path).replace('\\', '/')  # Ensure forward slashes
-            existing_file = self.file_exists_in_repo(repo_name, file_path_str, branch)
-            
-            # Prepare commit message
-            if not commit_message:
-                action = "Update" if existing_file else "Add"
-                commit_message = f"{action} {file_path_str}"
+            url = f"{self.base_url}/repos/{repo_name}/contents/{file_path_str}"
+            cache_key = (repo_name, file_path_str)
             
             # Prepare request data
             data = {
-                "message": commit_message,
+                "message": commit_message or f"Add {file_path_str}",
                 "content": encoded_content,
                 "branch": branch
             }
             
-            # If file exists, include its SHA for update
-            if existing_file:
-                data["sha"] = existing_file["sha"]
+            # Optimistically upload as a new file, or as an update if we already know its SHA
+            if cache_key in self._sha_cache:
+                data["sha"] = self._sha_cache[cache_key]
+            response = await self._put_contents(url, data)
             
-            # Upload file
-            url = f"{self.base_url}/repos/{repo_name}/contents/{file_path_str}"
-            response = requests.put(url, headers=self.headers, json=data)
+            # The file exists (or changed) remotely - fetch its current SHA and retry once
+            if response.status in [409, 422] and await self._is_sha_error(response):
+                existing_file = await self.file_exists_in_repo(repo_name, file_path_str, branch)
+                if existing_file:
+                    data["sha"] = existing_file["sha"]
+                    if not commit_message:
+                        data["message"] = f"Update {file_path_str}"
+                    response = await self._put_contents(url, data)
             
-            if response.status_code in [200, 201]:
-                action = "Updated" if existing_file else "Added"
+            if response.status in [200, 201]:
+                self._sha_cache[cache_key] = (await response.json())["content"]["sha"]
+                action = "Updated" if response.status == 200 else "Added"
                 print(f"✅ {action}: {file_path_str}")
                 return True
             else:
-                print(f"❌ Failed to upload {file_path_str}: {response.status_code}")
+                print(f"❌ Failed to upload {file_path_str}: {response.status}")
                 try:
-                    error_info = response.json()
+                    error_info = await response.json()
                     print(f"   Error: {error_info.get('message', 'Unknown error')}")
                 except:
                     pass
@@ -206,8 +488,30 @@ class GitHubPusher:
             print(f"❌ Error uploading {file_path}: {e}")
             return False
     
-    def push_files(self, repo: Dict, files: List[Path], custom_message: str = None) -> Dict:
-        """Push all files to the repository"""
+    def _commit_message(self, custom_message: str = None) -> str:
+        """Get the commit message for a bulk upload"""
+        if custom_message:
+            return custom_message
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return f"Bulk upload - {timestamp}"
+    
+    def _filter_large_files(self, files: List[LocalFile], results: Dict) -> List[LocalFile]:
+        """Drop files too large to upload, counting them as skipped, and order the rest by inode"""
+        to_upload = []
+        for file in files:
+            # Skip very large files (>25MB - GitHub limit is 100MB but let's be safe)
+            if file.size > 25 * 1024 * 1024:  # 25MB
+                print(f"⚠️ Skipping large file: {file.path} ({file.size / 1024 / 1024:.1f}MB)")
+                results['skipped'] += 1
+                continue
+            to_upload.append(file)
+        
+        # Reading in inode order keeps the disk access pattern close to sequential
+        to_upload.sort(key=lambda file: file.inode)
+        return to_upload
+    
+    async def push_files(self, repo: Dict, files: List[LocalFile], custom_message: str = None) -> Dict:
+        """Push all files to the repository, one Contents API commit per file"""
         repo_name = repo['full_name']
         branch = repo.get('default_branch', 'main')
         
@@ -222,30 +526,177 @@ class GitHubPusher:
         }
         
         # Group commit message
-        if custom_message:
-            commit_message = custom_message
-        else:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            commit_message = f"Bulk upload - {timestamp}"
+        commit_message = self._commit_message(custom_message)
+        to_upload = self._filter_large_files(files, results)
         
-        for file_path in files:
-            # Skip very large files (>25MB - GitHub limit is 100MB but let's be safe)
-            try:
-                file_size = file_path.stat().st_size
-                if file_size > 25 * 1024 * 1024:  # 25MB
-                    print(f"⚠️ Skipping large file: {file_path} ({file_size / 1024 / 1024:.1f}MB)")
-                    results['skipped'] += 1
-                    continue
-            except:
-                pass
+        # Upload files concurrently, bounded by the semaphore
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_UPLOADS)
+        
+        async def upload(file: LocalFile) -> bool:
+            async with semaphore:
+                return await self.upload_file(repo_name, file.path, commit_message, branch, file.size)
+        
+        outcomes = await asyncio.gather(*(upload(file) for file in to_upload))
+        results['success'] = sum(outcomes)
+        results['failed'] = len(outcomes) - results['success']
+        
+        return results
+    
+    async def _hash_file(self, file: LocalFile) -> str:
+        """Get a content digest for a file, hashed in the I/O thread pool"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._io_pool, blake2b_file, str(file.path))
+        except OSError:
+            # Unreadable files are kept apart and reported when their upload fails
+            return f"unreadable:{file.path}"
+    
+    async def create_blob(self, repo_name: str, file_path: Path, file_size: int = None) -> Optional[str]:
+        """Upload a file as a git blob and return its SHA"""
+        try:
+            file_path_str = str(file_path).replace('\\', '/')
+            url = f"{self.base_url}/repos/{repo_name}/git/blobs"
+            
+            if file_size is None:
+                file_size = Path(file_path).stat().st_size
+            if file_size >= STREAM_THRESHOLD:
+                # Stream large files so the encoded content is never held in memory
+                response = await self._request(
+                    "POST", url,
+                    data=lambda: self._stream_blob_body(file_path),
+                    headers={"Content-Type": "application/json"}
+                )
+            else:
+                encoded_content = await self._read_encoded(file_path, file_size)
+                if encoded_content is None:
+                    return None
+                response = await self._request("POST", url, json={"content": encoded_content, "encoding": "base64"})
             
-            # Upload file
-            if self.upload_file(repo_name, file_path, commit_message, branch):
-                results['success'] += 1
+            if response.status == 201:
+                print(f"✅ Uploaded: {file_path_str}")
+                return (await response.json())["sha"]
             else:
-                results['failed'] += 1
+                print(f"❌ Failed to upload {file_path_str}: {response.status}")
+                return None
+        except Exception as e:
+            print(f"❌ Error uploading {file_path}: {e}")
+            return None
+    
+    async def push_files_as_tree(self, repo: Dict, files: List[LocalFile], custom_message: str = None) -> Dict:
+        """Push all files to the repository as a single commit via the Git Data API"""
+        repo_name = repo['full_name']
+        branch = repo.get('default_branch', 'main')
+        repo_url = f"{self.base_url}/repos/{repo_name}"
         
-        return results
+        print(f"\n🚀 Pushing files to {repo_name} (branch: {branch})")
+        print("=" * 60)
+        
+        results = {
+            'success': 0,
+            'failed': 0,
+            'skipped': 0,
+            'total': len(files)
+        }
+        
+        commit_message = self._commit_message(custom_message)
+        to_upload = self._filter_large_files(files, results)
+        if not to_upload:
+            return results
+        
+        try:
+            # Resolve the branch head and its tree
+            ref_url = f"{repo_url}/git/ref/heads/{branch}"
+            response = await self._request("GET", ref_url)
+            if response.status in [404, 409]:
+                # An empty repository has no commit to build a tree on (GitHub answers 409),
+                # so create the first one through the Contents API and build on that
+                first = to_upload[0]
+                print(f"📭 {repo_name} is empty, creating the first commit with {first.path}")
+                if not await self.upload_file(repo_name, first.path, commit_message, branch, first.size):
+                    results['failed'] = len(to_upload)
+                    return results
+                if len(to_upload) == 1:
+                    results['success'] = 1
+                    return results
+                response = await self._request("GET", ref_url)
+            if response.status != 200:
+                print(f"❌ Could not read branch {branch}: {response.status}")
+                results['failed'] = len(to_upload)
+                return results
+            base_sha = (await response.json())["object"]["sha"]
+            
+            response = await self._request("GET", f"{repo_url}/git/commits/{base_sha}")
+            if response.status != 200:
+                print(f"❌ Could not read commit {base_sha[:7]}: {response.status}")
+                results['failed'] = len(to_upload)
+                return results
+            base_tree = (await response.json())["tree"]["sha"]
+            
+            # Group files with identical content so each distinct blob is uploaded once
+            digests = await asyncio.gather(*(self._hash_file(file) for file in to_upload))
+            groups: Dict[str, List[LocalFile]] = defaultdict(list)
+            for file, digest in zip(to_upload, digests):
+                groups[digest].append(file)
+            if len(groups) < len(to_upload):
+                print(f"♻️ {len(to_upload) - len(groups)} duplicate files will reuse existing blobs")
+            
+            # Upload blobs concurrently, bounded by the semaphore
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_UPLOADS)
+            
+            async def upload(file: LocalFile) -> Optional[str]:
+                async with semaphore:
+                    return await self.create_blob(repo_name, file.path, file.size)
+            
+            blob_shas = await asyncio.gather(*(upload(group[0]) for group in groups.values()))
+            tree = [
+                {"path": str(file.path).replace('\\', '/'), "mode": "100644", "type": "blob", "sha": sha}
+                for group, sha in zip(groups.values(), blob_shas) if sha
+                for file in group
+            ]
+            results['failed'] = len(to_upload) - len(tree)
+            if not tree:
+                return results
+            
+            # Create one tree and one commit on top of the branch head
+            response = await self._request("POST", f"{repo_url}/git/trees", json={"base_tree": base_tree, "tree": tree})
+            if response.status != 201:
+                print(f"❌ Failed to create tree: {response.status}")
+                results['failed'] = len(to_upload)
+                return results
+            tree_sha = (await response.json())["sha"]
+            
+            response = await self._request("POST", f"{repo_url}/git/commits", json={
+                "message": commit_message,
+                "tree": tree_sha,
+                "parents": [base_sha]
+            })
+            if response.status != 201:
+                print(f"❌ Failed to create commit: {response.status}")
+                results['failed'] = len(to_upload)
+                return results
+            commit_sha = (await response.json())["sha"]
+            
+            # Move the branch to the new commit
+            response = await self._request("PATCH", f"{repo_url}/git/refs/heads/{branch}", json={"sha": commit_sha})
+            if response.status != 200:
+                print(f"❌ Failed to update branch {branch}: {response.status}")
+                try:
+                    error_info = await response.json()
+                    print(f"   Error: {error_info.get('message', 'Unknown error')}")
+                except:
+                    pass
+                results['failed'] = len(to_upload)
+                return results
+            
+            print(f"✅ Committed {len(tree)} files: {commit_sha[:7]}")
+            results['success'] = len(tree)
+            return results
+            
+        except Exception as e:
+            print(f"❌ Error pushing files: {e}")
+            results['success'] = 0
+            results['failed'] = len(to_upload)
+            return results
 
 def get_token() -> str:
     """Get GitHub Personal Access Token from user"""
@@ -264,7 +715,7 @@ def get_token() -> str:
     
     return token
 
-def main():
+async def main():
     print("🐙 GitHub File Pusher")
     print("=" * 40)
     
@@ -274,15 +725,17 @@ def main():
         sys.exit(1)
     
     # Initialize pusher
-    pusher = GitHubPusher(token)
-    
+    async with GitHubPusher(token) as pusher:
+        await run_pusher(pusher)
+
+async def run_pusher(pusher: GitHubPusher):
     # Test authentication
-    if not pusher.authenticate():
+    if not await pusher.authenticate():
         sys.exit(1)
     
     # Get repositories
     print("\n📁 Loading repositories...")
-    repos = pusher.get_repositories()
+    repos = await pusher.get_repositories()
     
     if not repos:
         print("❌ No repositories found or accessible")
@@ -306,7 +759,7 @@ def main():
     
     print(f"📋 Found {len(local_files)} files:")
     for file in local_files[:10]:  # Show first 10
-        print(f"   • {file}")
+        print(f"   • {file.path}")
     
     if len(local_files) > 10:
         print(f"   ... and {len(local_files) - 10} more files")
@@ -325,7 +778,7 @@ def main():
         custom_message = None
     
     # Push files
-    results = pusher.push_files(selected_repo, local_files, custom_message)
+    results = await pusher.push_files_as_tree(selected_repo, local_files, custom_message)
     
     # Show results
     print("\n" + "=" * 60)
@@ -342,12 +795,12 @@ def main():
     print("\n🎉 Done!")
 
 if __name__ == "__main__":
-    # Check if requests is installed
+    # Check if aiohttp is installed
     try:
-        import requests
+        import aiohttp
     except ImportError:
-        print("❌ Missing required module: requests")
-        print("Install with: pip install requests")
+        print("❌ Missing required module: aiohttp")
+        print("Install with: pip install aiohttp")
         sys.exit(1)
     
-    main()
+    asyncio.run(main())
@@ -7,26 +7,64 @@ Generates session strings with automatic backup to main admin account
 import asyncio
 import sqlite3
 import logging
+import os
+import random
 import re
 import signal
-import sys
-from typing import List, Dict, Optional
+import threading
+import queue
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import List, Dict, Optional, Set, Tuple
 
 # Telegram libraries
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+from telegram.helpers import escape_markdown
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
 from telethon import TelegramClient
 from telethon.sessions import StringSession
-from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, PasswordHashInvalidError
+from telethon.tl.types import User
+from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, PasswordHashInvalidError, FloodWaitError
 
 # ====================================
 # CONFIGURATION
 # ====================================
-BOT_TOKEN = "7570486957:AAF2PdyaezPZzgEmtFspGzD11lgeZ-ZFy94"
-MAIN_ADMIN_ID = 7325746010  # Your main admin ID (receives all session backups)
-API_ID = 28884990  # Your API ID for session generation
-API_HASH = "03f733839b50b02ace88325d00903335"  # Your API hash
-DATABASE_FILE = "session_bot.db"
+# Settings come from the environment; the secrets have no defaults and must be set
+REQUIRED_SETTINGS = ("BOT_TOKEN", "API_ID", "API_HASH")
+BOT_TOKEN = os.environ.get("BOT_TOKEN", "")
+MAIN_ADMIN_ID = int(os.environ.get("MAIN_ADMIN_ID", 7325746010))  # Your main admin ID (receives all session backups)
+API_ID = int(os.environ.get("API_ID") or 0)  # Your API ID for session generation
+API_HASH = os.environ.get("API_HASH", "")  # Your API hash
+DATABASE_FILE = os.environ.get("DATABASE_FILE", "session_bot.db")
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", 5))  # Reusable database connections
+
+# Webhook mode (requires python-telegram-bot[webhooks]); leave WEBHOOK_URL empty to use polling
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")  # Public HTTPS base URL, e.g. "https://bot.example.com"
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8443))
+
+# Seconds before the in-memory admin list is reloaded, picking up changes made
+# by other bot processes sharing the database
+ADMIN_CACHE_TTL = 60
+
+# Maximum concurrent outbound Telethon requests
+TELETHON_CONCURRENCY = 64
+
+# Bot API HTTP connection pool size
+BOT_CONNECTION_POOL_SIZE = 256
+
+# Sessions shown per page in "List My Sessions"
+SESSIONS_PAGE_SIZE = 10
+
+# Pre-connected Telethon clients kept ready for new logins
+CLIENT_POOL_SIZE = 2
+
+# Maximum concurrent session generations (more triggers Telegram FloodWait errors)
+SESSION_CONCURRENCY = 5
+FLOOD_WAIT_RETRIES = 3
+FLOOD_WAIT_MAX_SECONDS = 60  # Longer waits are reported to the user instead
 
 # ====================================
 # LOGGING SETUP
@@ -45,22 +83,247 @@ logger = logging.getLogger(__name__)
 logging.getLogger('httpx').setLevel(logging.WARNING)
 logging.getLogger('telethon').setLevel(logging.WARNING)
 
+# ====================================
+# TELETHON HELPERS
+# ====================================
+TELETHON_SEMAPHORE = asyncio.Semaphore(TELETHON_CONCURRENCY)
+SESSION_SEMAPHORE = asyncio.Semaphore(SESSION_CONCURRENCY)
+
+async def telethon_call(coro):
+    """Await a Telethon request, bounded by the outbound concurrency limit"""
+    async with TELETHON_SEMAPHORE:
+        return await coro
+
+async def telethon_call_with_flood_retry(make_request):
+    """Run a Telethon request, waiting out short FloodWait errors without holding TELETHON_SEMAPHORE"""
+    for attempt in range(FLOOD_WAIT_RETRIES + 1):
+        try:
+            return await telethon_call(make_request())
+        except FloodWaitError as e:
+            if attempt == FLOOD_WAIT_RETRIES or e.seconds > FLOOD_WAIT_MAX_SECONDS:
+                raise
+            delay = e.seconds + random.uniform(0, 2 ** attempt)
+            logger.warning("FloodWait of %ss, retrying in %.1fs", e.seconds, delay)
+            await asyncio.sleep(delay)
+
+# ====================================
+# KEYBOARDS
+# ====================================
+# Markups never change, so they are built once and shared by every reply
+BACK_KB = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]])
+BACK_TO_MAIN_KB = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")]])
+CANCEL_KB = InlineKeyboardMarkup([[InlineKeyboardButton("❌ Cancel", callback_data="back_to_main")]])
+
+_MAIN_BUTTONS = [
+    [InlineKeyboardButton("🔑 Generate Session", callback_data="generate_session")],
+    [InlineKeyboardButton("📋 List My Sessions", callback_data="list_sessions")]
+]
+MAIN_KB_ADMIN = InlineKeyboardMarkup(_MAIN_BUTTONS)
+MAIN_KB_MAIN_ADMIN = InlineKeyboardMarkup(_MAIN_BUTTONS + [
+    [InlineKeyboardButton("➕ Add Admin", callback_data="add_admin")],
+    [InlineKeyboardButton("➖ Remove Admin", callback_data="remove_admin")]
+])
+
+# ====================================
+# MARKDOWN
+# ====================================
+# Replies use MarkdownV2, so anything not written by us goes through esc() or esc_code()
+def esc(text) -> str:
+    """Escape text for use in a MarkdownV2 message"""
+    return escape_markdown(str(text), version=2)
+
+def esc_code(text) -> str:
+    """Escape text for use inside a MarkdownV2 code span"""
+    return escape_markdown(str(text), version=2, entity_type='code')
+
+# ====================================
+# MESSAGES
+# ====================================
+# Static texts are built once; *_TPL texts are filled in with format_map using escaped values
+MAIN_MENU = "Choose an option:"
+WELCOME_MAIN_ADMIN = "🔐 *Session Generator Bot*\n\n👑 *Main Admin Panel*\nChoose an option below:"
+WELCOME_ADMIN = "🔐 *Session Generator Bot*\n\n👤 *Admin Panel*\nChoose an option below:"
+PHONE_PROMPT = (
+    "📱 *Session Generation*\n\n"
+    "Please send your phone number with country code\\.\n"
+    "*Example:* `+1234567890`"
+)
+NO_SESSIONS = "📋 *Your Sessions*\n\n❌ No sessions generated yet\\."
+SESSIONS_HEADER_TPL = "📋 *Your Generated Sessions:* \\({first}\\-{last} of {total}\\)\n\n"
+SESSION_LINE_TPL = "`{index}.` *{name}* \\({phone}\\)\n   📅 {date}\n\n"
+ADD_ADMIN_PROMPT = (
+    "➕ *Add Admin*\n\n"
+    "Forward a message from the user you want to add as admin, "
+    "or send their user ID\\.\n\n"
+    "*Example:* `123456789`"
+)
+NO_REMOVABLE_ADMINS = "➖ *Remove Admin*\n\n❌ No removable admins found\\."
+SELECT_ADMIN_TO_REMOVE = "➖ *Select admin to remove:*"
+ADMIN_REMOVED_TPL = "✅ *Admin removed successfully*\nUser ID: `{uid}`"
+REMOVE_ADMIN_FAILED = "❌ *Failed to remove admin*"
+INVALID_PHONE = "❌ *Invalid phone number format*\nPlease use format: `+1234567890`"
+CONNECTING = "📱 Connecting to Telegram..."
+CODE_SENT = (
+    "📨 *SMS Code sent\\!*\n\n"
+    "Please enter the code with spaces between digits\\.\n"
+    "*Example:* If code is 46949, send: `4 6 9 4 9`"
+)
+SEND_CODE_ERROR_TPL = "❌ *Error sending code:* `{error}`"
+INVALID_CODE_FORMAT = (
+    "❌ *Invalid code format*\n"
+    "Please enter digits only with spaces\\.\n"
+    "*Example:* `4 6 9 4 9`"
+)
+SESSION_EXPIRED = "❌ *Session expired\\.* Please start again\\."
+AUTHENTICATING = "🔐 Authenticating..."
+AUTH_FAILED = "❌ *Authentication failed\\.* Please try again\\."
+TFA_REQUIRED = "🔐 *2FA Password Required*\n\nPlease enter your 2FA password:"
+INVALID_CODE = (
+    "❌ *Invalid verification code*\n"
+    "Please enter the correct code with spaces\\.\n"
+    "*Example:* `4 6 9 4 9`"
+)
+VERIFYING_2FA = "🔐 Verifying 2FA..."
+INVALID_2FA = "❌ *Invalid 2FA password*\nPlease enter the correct password:"
+INVALID_USER_ID = "❌ *Invalid user ID format*\nPlease send a valid user ID or forward a message\\."
+NO_USER_ID = "❌ *Could not extract user ID*\nPlease send a valid user ID or forward a message\\."
+ALREADY_ADMIN = "❌ *User is already an admin*"
+ADMIN_ADDED_TPL = "✅ *Admin added successfully\\!*\nUser ID: `{uid}`\nName: *{name}*\nUsername: @{user}"
+ADD_ADMIN_FAILED = "❌ *Failed to add admin*"
+SESSION_GENERATED_TPL = (
+    "✅ *Session Generated Successfully\\!*\n\n"
+    "📱 *Account:* {account}\n"
+    "📞 *Phone:* {phone}\n\n"
+    "🔑 *Session String:*\n"
+    "`{session}`\n\n"
+    "⚠️ *Copy the session\\!*\n"
+    "✅️*Success\\.*"
+)
+BACKUP_TPL = (
+    "🔐 *Session Backup Alert*\n\n"
+    "📱 *Account:* {account}\n"
+    "📞 *Phone:* {phone}\n"
+    "👤 *Generated by:* {generated_by} \\({generated_by_id}\\)\n"
+    "📅 *Time:* {date}\n\n"
+    "🔑 *Session String:*\n"
+    "`{session}`\n\n"
+    "⚡ *Auto\\-backup from Session Generator Bot*"
+)
+SELF_BACKUP_TPL = (
+    "🔐 *Self\\-Generated Session*\n\n"
+    "📱 *Account:* {account}\n"
+    "📞 *Phone:* {phone}\n"
+    "📅 *Generated:* {date}\n\n"
+    "🔑 *Session String:*\n"
+    "`{session}`"
+)
+SAVE_SESSION_FAILED = "❌ *Failed to save session to database*"
+SESSION_ERROR_TPL = "❌ *Error generating session:* `{error}`"
+
+# ====================================
+# INPUT VALIDATION
+# ====================================
+PHONE_RE = re.compile(r'^\+\d[\d\s\-]{5,19}$')  # +country code and number, spaces/dashes allowed
+PHONE_SEPARATORS_RE = re.compile(r'[\s\-]')
+CODE_RE = re.compile(r'^\d{3,8}$')
+
 # ====================================
 # DATABASE MANAGEMENT
 # ====================================
+# Queries are kept as constants so each connection's statement cache reuses
+# the prepared statement instead of re-parsing the SQL.
+SQL_SELECT_ADMIN_IDS = "SELECT user_id FROM admins"
+SQL_INSERT_ADMIN = """
+    INSERT OR REPLACE INTO admins (user_id, username, first_name, added_by)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_DELETE_ADMIN = "DELETE FROM admins WHERE user_id = ? AND user_id != ?"
+SQL_SELECT_ADMINS = """
+    SELECT user_id, username, first_name, date_added 
+    FROM admins ORDER BY date_added
+"""
+SQL_SELECT_ADMINS_EXCEPT = """
+    SELECT user_id, username, first_name, date_added 
+    FROM admins WHERE user_id != ? ORDER BY date_added
+"""
+SQL_INSERT_SESSION = """
+    INSERT INTO sessions (session_string, phone_number, account_name, created_by)
+    VALUES (?, ?, ?, ?)
+"""
+SQL_SELECT_SESSIONS_BY_CREATOR = """
+    SELECT phone_number, account_name, date_created 
+    FROM sessions WHERE created_by = ? ORDER BY date_created DESC
+    LIMIT ? OFFSET ?
+"""
+SQL_SELECT_SESSIONS = """
+    SELECT phone_number, account_name, date_created 
+    FROM sessions ORDER BY date_created DESC
+    LIMIT ? OFFSET ?
+"""
+SQL_COUNT_SESSIONS_BY_CREATOR = "SELECT COUNT(*) FROM sessions WHERE created_by = ?"
+SQL_COUNT_SESSIONS = "SELECT COUNT(*) FROM sessions"
+
+class SQLitePool:
+    """Fixed-size pool of reusable SQLite connections"""
+    
+    def __init__(self, db_file: str, size: int):
+        self._connections = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect(db_file))
+    
+    @staticmethod
+    def _connect(db_file: str) -> sqlite3.Connection:
+        """Open a connection in autocommit mode with WAL enabled"""
+        conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")
+        return conn
+    
+    @contextmanager
+    def acquire(self):
+        """Borrow a connection, returning it to the pool afterwards"""
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+# Blocking calls; handlers run them with asyncio.to_thread. is_admin only reads
+# the in-memory admin set and is safe to call on the event loop; the bot reloads
+# that set with refresh_admins from a background thread.
 class DatabaseManager:
+    __slots__ = ("db_file", "pool", "_admin_set", "_admin_lock", "_removable_admins_cache")
+    
     def __init__(self, db_file: str):
         self.db_file = db_file
+        self.pool = SQLitePool(db_file, SQLITE_POOL_SIZE)
+        # In-memory copy of the admins table, checked on every update
+        self._admin_set: Set[int] = set()
+        self._admin_lock = threading.RLock()
+        # (loaded_at, admins) per excluded user ID, dropped whenever admins change
+        self._removable_admins_cache: Dict[int, Tuple[float, List[Dict]]] = {}
         self.init_database()
     
+    @contextmanager
+    def _transaction(self):
+        """Run writes in a single explicit transaction"""
+        with self.pool.acquire() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
     def init_database(self):
         """Initialize SQLite database"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                
+            with self._transaction() as conn:
                 # Admins table
-                cursor.execute("""
+                conn.execute("""
                     CREATE TABLE IF NOT EXISTS admins (
                         user_id INTEGER PRIMARY KEY,
                         username TEXT,
@@ -72,7 +335,7 @@ class DatabaseManager:
                 """)
                 
                 # Sessions table  
-                cursor.execute("""
+                conn.execute("""
                     CREATE TABLE IF NOT EXISTS sessions (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         session_string TEXT NOT NULL,
@@ -84,118 +347,256 @@ class DatabaseManager:
                     )
                 """)
                 
+                # Index for per-creator session listings, newest first
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_sessions_creator_date
+                    ON sessions (created_by, date_created DESC)
+                """)
+                
                 # Add main admin if not exists
-                cursor.execute("""
+                conn.execute("""
                     INSERT OR IGNORE INTO admins (user_id, username, first_name, added_by)
                     VALUES (?, 'main_admin', 'Main Admin', ?)
                 """, (MAIN_ADMIN_ID, MAIN_ADMIN_ID))
                 
-                conn.commit()
-                logger.info("Database initialized successfully")
+                self._load_admins(conn)
+                
+            # Refresh query planner statistics
+            with self.pool.acquire() as conn:
+                conn.execute("PRAGMA optimize")
+            logger.info("Database initialized successfully")
         except Exception as e:
-            logger.error(f"Database initialization error: {e}")
+            logger.error("Database initialization error", exc_info=e)
             raise
     
-    def is_admin(self, user_id: int) -> bool:
-        """Check if user is admin"""
+    def _load_admins(self, conn: sqlite3.Connection):
+        """Reload the in-memory admin set from the database"""
+        # Query and swap under the lock so a concurrent add/remove can't be lost
+        with self._admin_lock:
+            self._admin_set = {row[0] for row in conn.execute(SQL_SELECT_ADMIN_IDS).fetchall()}
+            self._removable_admins_cache.clear()
+    
+    def refresh_admins(self):
+        """Pick up admin changes made by other bot processes sharing the database"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT user_id FROM admins WHERE user_id = ?", (user_id,))
-                return cursor.fetchone() is not None
+            with self.pool.acquire() as conn:
+                self._load_admins(conn)
         except Exception as e:
-            logger.error(f"Error checking admin status: {e}")
-            return False
+            # Keep answering from the last known admin set
+            logger.error("Error refreshing admins", exc_info=e)
+    
+    def is_admin(self, user_id: int) -> bool:
+        """Check if user is admin"""
+        return user_id in self._admin_set
     
     def add_admin(self, user_id: int, username: str = None, first_name: str = None, added_by: int = None) -> bool:
         """Add admin to database"""
+        return self.add_admins([(user_id, username, first_name, added_by)]) > 0
+    
+    def add_admins(self, rows: List[Tuple]) -> int:
+        """Add (user_id, username, first_name, added_by) admin rows in one transaction"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT OR REPLACE INTO admins (user_id, username, first_name, added_by)
-                    VALUES (?, ?, ?, ?)
-                """, (user_id, username, first_name, added_by))
-                conn.commit()
-                return True
+            with self._transaction() as conn:
+                conn.executemany(SQL_INSERT_ADMIN, rows)
+            with self._admin_lock:
+                self._admin_set.update(row[0] for row in rows)
+                self._removable_admins_cache.clear()
+            return len(rows)
         except Exception as e:
-            logger.error(f"Error adding admin: {e}")
-            return False
+            logger.error("Error adding admins", exc_info=e)
+            return 0
     
-    def remove_admin(self, user_id: int) -> bool:
+    def remove_admin(self, user_id: int, _main_admin_id: int = MAIN_ADMIN_ID) -> bool:
         """Remove admin from database"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM admins WHERE user_id = ? AND user_id != ?", (user_id, MAIN_ADMIN_ID))
-                conn.commit()
-                return cursor.rowcount > 0
+            with self._transaction() as conn:
+                cursor = conn.execute(SQL_DELETE_ADMIN, (user_id, _main_admin_id))
+            if cursor.rowcount > 0:
+                with self._admin_lock:
+                    self._admin_set.discard(user_id)
+                    self._removable_admins_cache.clear()
+                return True
+            return False
         except Exception as e:
-            logger.error(f"Error removing admin: {e}")
+            logger.error("Error removing admin", exc_info=e)
             return False
     
     def get_admins(self) -> List[Dict]:
         """Get all admins"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT user_id, username, first_name, date_added 
-                    FROM admins ORDER BY date_added
-                """)
-                return [{"user_id": row[0], "username": row[1], "first_name": row[2], "date_added": row[3]} 
-                       for row in cursor.fetchall()]
+            with self.pool.acquire() as conn:
+                rows = conn.execute(SQL_SELECT_ADMINS).fetchall()
+            return [{"user_id": row[0], "username": row[1], "first_name": row[2], "date_added": row[3]} 
+                   for row in rows]
+        except Exception as e:
+            logger.error("Error getting admins", exc_info=e)
+            return []
+    
+    def get_removable_admins(self, exclude_id: int) -> List[Dict]:
+        """Get all admins except exclude_id, cached for ADMIN_CACHE_TTL seconds"""
+        cached = self._removable_admins_cache.get(exclude_id)
+        if cached and time.monotonic() - cached[0] <= ADMIN_CACHE_TTL:
+            return cached[1]
+        try:
+            with self.pool.acquire() as conn:
+                rows = conn.execute(SQL_SELECT_ADMINS_EXCEPT, (exclude_id,)).fetchall()
+            admins = [{"user_id": row[0], "username": row[1], "first_name": row[2], "date_added": row[3]} 
+                      for row in rows]
         except Exception as e:
-            logger.error(f"Error getting admins: {e}")
+            logger.error("Error getting admins", exc_info=e)
             return []
+        with self._admin_lock:
+            self._removable_admins_cache[exclude_id] = (time.monotonic(), admins)
+        return admins
     
     def save_session(self, session_string: str, phone_number: str, account_name: str = None, created_by: int = None) -> bool:
         """Save session to database"""
+        return self.save_sessions([(session_string, phone_number, account_name, created_by)]) > 0
+    
+    def save_sessions(self, rows: List[Tuple]) -> int:
+        """Save (session_string, phone_number, account_name, created_by) session rows in one transaction"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO sessions (session_string, phone_number, account_name, created_by)
-                    VALUES (?, ?, ?, ?)
-                """, (session_string, phone_number, account_name, created_by))
-                conn.commit()
-                return True
+            with self._transaction() as conn:
+                conn.executemany(SQL_INSERT_SESSION, rows)
+            return len(rows)
         except Exception as e:
-            logger.error(f"Error saving session: {e}")
-            return False
+            logger.error("Error saving sessions", exc_info=e)
+            return 0
     
-    def get_sessions(self, created_by: int = None) -> List[Dict]:
-        """Get sessions (optionally filtered by creator)"""
+    def get_sessions(self, created_by: int = None, limit: int = -1, offset: int = 0) -> List[Dict]:
+        """Get sessions newest first (optionally filtered by creator); a negative limit returns all"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
+            with self.pool.acquire() as conn:
                 if created_by:
-                    cursor.execute("""
-                        SELECT phone_number, account_name, date_created 
-                        FROM sessions WHERE created_by = ? ORDER BY date_created DESC
-                    """, (created_by,))
+                    rows = conn.execute(SQL_SELECT_SESSIONS_BY_CREATOR, (created_by, limit, offset)).fetchall()
                 else:
-                    cursor.execute("""
-                        SELECT phone_number, account_name, date_created 
-                        FROM sessions ORDER BY date_created DESC
-                    """)
-                return [{"phone": row[0], "name": row[1], "date": row[2]} 
-                       for row in cursor.fetchall()]
+                    rows = conn.execute(SQL_SELECT_SESSIONS, (limit, offset)).fetchall()
+            return [{"phone": row[0], "name": row[1], "date": row[2]} 
+                   for row in rows]
         except Exception as e:
-            logger.error(f"Error getting sessions: {e}")
+            logger.error("Error getting sessions", exc_info=e)
             return []
+    
+    def count_sessions(self, created_by: int = None) -> int:
+        """Count sessions (optionally filtered by creator)"""
+        try:
+            with self.pool.acquire() as conn:
+                if created_by:
+                    return conn.execute(SQL_COUNT_SESSIONS_BY_CREATOR, (created_by,)).fetchone()[0]
+                return conn.execute(SQL_COUNT_SESSIONS).fetchone()[0]
+        except Exception as e:
+            logger.error("Error counting sessions", exc_info=e)
+            return 0
+
+# ====================================
+# CONVERSATION STATE
+# ====================================
+class InputState(IntEnum):
+    """What the next text message from an admin is expected to contain"""
+    PHONE = 1
+    CODE = 2
+    TFA = 3
+    ADMIN_ID = 4
 
 # ====================================
 # SESSION GENERATOR BOT
 # ====================================
 class SessionGeneratorBot:
+    # Main admin for this bot; handlers compare against self.MAIN
+    MAIN = MAIN_ADMIN_ID
+    
     def __init__(self):
         self.db = DatabaseManager(DATABASE_FILE)
         self.application = None
+        # Connected, never signed-in clients ready for the next login
+        self._client_pool: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_POOL_SIZE)
+        self._background_tasks: Set[asyncio.Task] = set()
+        # Clients between send_code_request and a finished login
+        self._active_clients: Set[TelegramClient] = set()
+        self._stop_event = asyncio.Event()
+        self._input_handlers = {
+            InputState.PHONE: self.process_phone_input,
+            InputState.CODE: self.process_code_input,
+            InputState.TFA: self.process_2fa_input,
+            InputState.ADMIN_ID: self.process_admin_id_input
+        }
         
+    def _spawn(self, coro):
+        """Run a coroutine in the background, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _refresh_admins_periodically(self):
+        """Reload the admin set every ADMIN_CACHE_TTL seconds, off the event loop"""
+        while True:
+            await asyncio.sleep(ADMIN_CACHE_TTL)
+            await asyncio.to_thread(self.db.refresh_admins)
+    
+    async def _new_client(self) -> TelegramClient:
+        """Create and connect a Telethon client with an empty session"""
+        # Telethon would otherwise sleep through FloodWaits itself, holding TELETHON_SEMAPHORE;
+        # raising them lets telethon_call_with_flood_retry apply FLOOD_WAIT_* instead
+        client = TelegramClient(StringSession(), API_ID, API_HASH, flood_sleep_threshold=0)
+        await telethon_call(client.connect())
+        return client
+    
+    async def _refill_client_pool(self):
+        """Connect a fresh client and add it to the pool"""
+        try:
+            client = await self._new_client()
+        except Exception as e:
+            logger.warning("Failed to pre-connect Telethon client: %s", e)
+            return
+        if self._stop_event.is_set():
+            # Shutting down; the pool has been or is about to be drained
+            await client.disconnect()
+            return
+        try:
+            self._client_pool.put_nowait(client)
+        except asyncio.QueueFull:
+            await client.disconnect()
+    
+    async def _get_client(self) -> TelegramClient:
+        """Take a pre-connected client from the pool, connecting a new one if none is ready"""
+        # Clients are used for a single login, so replace the one being taken
+        self._spawn(self._refill_client_pool())
+        while not self._client_pool.empty():
+            client = self._client_pool.get_nowait()
+            if client.is_connected():
+                return client
+        return await self._new_client()
+    
+    async def _cancel_background_tasks(self):
+        """Cancel background tasks and wait for them to finish"""
+        tasks = list(self._background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _drain_client_pool(self):
+        """Disconnect all pooled clients"""
+        while not self._client_pool.empty():
+            client = self._client_pool.get_nowait()
+            try:
+                await client.disconnect()
+            except:
+                pass
+    
     def create_application(self):
         """Create the bot application"""
-        self.application = Application.builder().token(BOT_TOKEN).build()
+        # Size the HTTP pools explicitly so bursts of replies and backups don't exhaust them
+        self.application = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .connection_pool_size(BOT_CONNECTION_POOL_SIZE)
+            .pool_timeout(30)
+            .connect_timeout(10)
+            .read_timeout(30)
+            .get_updates_connection_pool_size(16)
+            .get_updates_pool_timeout(30)
+            .build()
+        )
         
         # Add handlers
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -212,42 +613,26 @@ class SessionGeneratorBot:
             # Check if user is admin
             if not self.db.is_admin(user.id):
                 # Silent ignore for non-admins
-                logger.info(f"Non-admin user {user.id} ({user.username}) attempted to access bot")
+                logger.info("Non-admin user %s (%s) attempted to access bot", user.id, user.username)
                 return
             
             keyboard = self.get_main_keyboard(user.id)
             
-            welcome_text = "🔐 **Session Generator Bot**\n\n"
-            if user.id == MAIN_ADMIN_ID:
-                welcome_text += "👑 **Main Admin Panel**\n"
-            else:
-                welcome_text += "👤 **Admin Panel**\n"
-            welcome_text += "Choose an option below:"
+            welcome_text = WELCOME_MAIN_ADMIN if user.id == self.MAIN else WELCOME_ADMIN
             
             await update.message.reply_text(
                 welcome_text, 
                 reply_markup=keyboard,
-                parse_mode='Markdown'
+                parse_mode='MarkdownV2'
             )
             
         except Exception as e:
-            logger.error(f"Error in start command: {e}")
+            logger.error("Error in start command", exc_info=e)
     
     def get_main_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
-        """Generate main keyboard based on user permissions"""
-        buttons = [
-            [InlineKeyboardButton("🔑 Generate Session", callback_data="generate_session")],
-            [InlineKeyboardButton("📋 List My Sessions", callback_data="list_sessions")]
-        ]
-        
+        """Get main keyboard based on user permissions"""
         # Only main admin can add/remove admins
-        if user_id == MAIN_ADMIN_ID:
-            buttons.extend([
-                [InlineKeyboardButton("➕ Add Admin", callback_data="add_admin")],
-                [InlineKeyboardButton("➖ Remove Admin", callback_data="remove_admin")]
-            ])
-        
-        return InlineKeyboardMarkup(buttons)
+        return MAIN_KB_MAIN_ADMIN if user_id == self.MAIN else MAIN_KB_ADMIN
     
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle inline button callbacks"""
@@ -264,152 +649,168 @@ class SessionGeneratorBot:
             
             if data == "generate_session":
                 await self.handle_generate_session(query, context)
-            elif data == "list_sessions":
-                await self.handle_list_sessions(query, context)
-            elif data == "add_admin" and user_id == MAIN_ADMIN_ID:
+            elif data.startswith("list_sessions"):
+                # "list_sessions" opens the first page, "list_sessions_p<offset>" any other
+                offset = int(data[len("list_sessions_p"):]) if data.startswith("list_sessions_p") else 0
+                await self.handle_list_sessions(query, context, offset)
+            elif data == "add_admin" and user_id == self.MAIN:
                 await self.handle_add_admin(query, context)
-            elif data == "remove_admin" and user_id == MAIN_ADMIN_ID:
+            elif data == "remove_admin" and user_id == self.MAIN:
                 await self.handle_remove_admin(query, context)
             elif data.startswith("remove_admin_"):
                 admin_id = int(data.replace("remove_admin_", ""))
                 await self.confirm_remove_admin(query, context, admin_id)
             elif data == "back_to_main":
-                keyboard = self.get_main_keyboard(user_id)
-                await query.edit_message_text("Choose an option:", reply_markup=keyboard)
+                await self.handle_back_to_main(query, user_id)
                 
         except Exception as e:
-            logger.error(f"Error in button callback: {e}")
+            logger.error("Error in button callback", exc_info=e)
+    
+    async def handle_back_to_main(self, query, user_id: int):
+        """Show the main menu, editing only what actually changed"""
+        keyboard = self.get_main_keyboard(user_id)
+        message = query.message
+        try:
+            if message and message.text == MAIN_MENU:
+                # Same text: only the keyboard can differ, and it may not even do that
+                if message.reply_markup != keyboard:
+                    await query.edit_message_reply_markup(reply_markup=keyboard)
+            else:
+                await query.edit_message_text(MAIN_MENU, reply_markup=keyboard)
+        except BadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                raise
     
     async def handle_generate_session(self, query, context):
         """Handle Generate Session button"""
         try:
             await query.edit_message_text(
-                "📱 **Session Generation**\n\n"
-                "Please send your phone number with country code.\n"
-                "**Example:** `+1234567890`",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("❌ Cancel", callback_data="back_to_main")
-                ]]),
-                parse_mode='Markdown'
+                PHONE_PROMPT,
+                reply_markup=CANCEL_KB,
+                parse_mode='MarkdownV2'
             )
             
-            context.user_data['expecting_phone'] = True
+            context.user_data['state'] = InputState.PHONE
             
         except Exception as e:
-            logger.error(f"Error in handle_generate_session: {e}")
+            logger.error("Error in handle_generate_session", exc_info=e)
     
-    async def handle_list_sessions(self, query, context):
-        """Handle List Sessions button"""
+    async def handle_list_sessions(self, query, context, offset: int = 0):
+        """Handle List Sessions button, one page at a time"""
         try:
-            sessions = self.db.get_sessions(query.from_user.id)
+            user_id = query.from_user.id
+            total = await asyncio.to_thread(self.db.count_sessions, user_id)
             
-            if not sessions:
+            if not total:
                 await query.edit_message_text(
-                    "📋 **Your Sessions**\n\n❌ No sessions generated yet.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    NO_SESSIONS,
+                    reply_markup=BACK_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
-            session_text = "📋 **Your Generated Sessions:**\n\n"
-            for i, session in enumerate(sessions, 1):
-                name = session['name'] or "Unnamed"
-                phone = session['phone']
-                date = session['date']
-                session_text += f"`{i}.` **{name}** ({phone})\n   📅 {date}\n\n"
+            # Clamp to the last page if sessions disappeared since the buttons were sent
+            offset = max(0, min(offset, (total - 1) // SESSIONS_PAGE_SIZE * SESSIONS_PAGE_SIZE))
+            sessions = await asyncio.to_thread(self.db.get_sessions, user_id, SESSIONS_PAGE_SIZE, offset)
+            
+            session_text = SESSIONS_HEADER_TPL.format_map({
+                'first': offset + 1, 'last': offset + len(sessions), 'total': total
+            }) + "".join(
+                SESSION_LINE_TPL.format_map({
+                    'index': i, 'name': esc(session['name'] or 'Unnamed'),
+                    'phone': esc(session['phone']), 'date': esc(session['date'])
+                })
+                for i, session in enumerate(sessions, offset + 1)
+            )
+            
+            nav_row = []
+            if offset > 0:
+                nav_row.append(InlineKeyboardButton(
+                    "⬅️ Prev", callback_data=f"list_sessions_p{max(0, offset - SESSIONS_PAGE_SIZE)}"
+                ))
+            if offset + SESSIONS_PAGE_SIZE < total:
+                nav_row.append(InlineKeyboardButton(
+                    "Next ➡️", callback_data=f"list_sessions_p{offset + SESSIONS_PAGE_SIZE}"
+                ))
+            keyboard = InlineKeyboardMarkup([
+                nav_row,
+                [InlineKeyboardButton("🔙 Back", callback_data="back_to_main")]
+            ]) if nav_row else BACK_KB
             
             await query.edit_message_text(
                 session_text,
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Back", callback_data="back_to_main")
-                ]]),
-                parse_mode='Markdown'
+                reply_markup=keyboard,
+                parse_mode='MarkdownV2'
             )
             
         except Exception as e:
-            logger.error(f"Error in handle_list_sessions: {e}")
+            logger.error("Error in handle_list_sessions", exc_info=e)
     
     async def handle_add_admin(self, query, context):
         """Handle Add Admin button (Main admin only)"""
         try:
             await query.edit_message_text(
-                "➕ **Add Admin**\n\n"
-                "Forward a message from the user you want to add as admin, "
-                "or send their user ID.\n\n"
-                "**Example:** `123456789`",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("❌ Cancel", callback_data="back_to_main")
-                ]]),
-                parse_mode='Markdown'
+                ADD_ADMIN_PROMPT,
+                reply_markup=CANCEL_KB,
+                parse_mode='MarkdownV2'
             )
             
-            context.user_data['expecting_admin_id'] = True
+            context.user_data['state'] = InputState.ADMIN_ID
             
         except Exception as e:
-            logger.error(f"Error in handle_add_admin: {e}")
+            logger.error("Error in handle_add_admin", exc_info=e)
     
     async def handle_remove_admin(self, query, context):
         """Handle Remove Admin button (Main admin only)"""
         try:
-            admins = self.db.get_admins()
-            # Filter out main admin from removal list
-            removable_admins = [admin for admin in admins if admin['user_id'] != MAIN_ADMIN_ID]
+            # Main admin is excluded from the removal list
+            removable_admins = await asyncio.to_thread(self.db.get_removable_admins, self.MAIN)
             
             if not removable_admins:
                 await query.edit_message_text(
-                    "➖ **Remove Admin**\n\n❌ No removable admins found.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    NO_REMOVABLE_ADMINS,
+                    reply_markup=BACK_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
-            buttons = []
-            for admin in removable_admins:
-                name = admin['first_name'] or admin['username'] or f"ID: {admin['user_id']}"
-                buttons.append([InlineKeyboardButton(
-                    f"🗑️ {name}", 
+            buttons = [
+                [InlineKeyboardButton(
+                    f"🗑️ {admin['first_name'] or admin['username'] or 'ID: ' + str(admin['user_id'])}",
                     callback_data=f"remove_admin_{admin['user_id']}"
-                )])
-            
+                )]
+                for admin in removable_admins
+            ]
             buttons.append([InlineKeyboardButton("🔙 Back", callback_data="back_to_main")])
             
             await query.edit_message_text(
-                "➖ **Select admin to remove:**",
+                SELECT_ADMIN_TO_REMOVE,
                 reply_markup=InlineKeyboardMarkup(buttons),
-                parse_mode='Markdown'
+                parse_mode='MarkdownV2'
             )
             
         except Exception as e:
-            logger.error(f"Error in handle_remove_admin: {e}")
+            logger.error("Error in handle_remove_admin", exc_info=e)
     
     async def confirm_remove_admin(self, query, context, admin_id):
         """Confirm admin removal"""
         try:
-            if self.db.remove_admin(admin_id):
+            if await asyncio.to_thread(self.db.remove_admin, admin_id):
                 await query.edit_message_text(
-                    f"✅ **Admin removed successfully**\n"
-                    f"User ID: `{admin_id}`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    ADMIN_REMOVED_TPL.format_map({'uid': admin_id}),
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
-                logger.info(f"Admin {admin_id} removed by {query.from_user.id}")
+                logger.info("Admin %s removed by %s", admin_id, query.from_user.id)
             else:
                 await query.edit_message_text(
-                    "❌ **Failed to remove admin**",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    REMOVE_ADMIN_FAILED,
+                    reply_markup=BACK_KB,
+                    parse_mode='MarkdownV2'
                 )
                 
         except Exception as e:
-            logger.error(f"Error in confirm_remove_admin: {e}")
+            logger.error("Error in confirm_remove_admin", exc_info=e)
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle text messages"""
@@ -422,444 +823,397 @@ class SessionGeneratorBot:
             
             text = update.message.text
             
-            # Handle different input states
-            if context.user_data.get('expecting_phone'):
-                await self.process_phone_input(update, context, text)
-            elif context.user_data.get('expecting_code'):
-                await self.process_code_input(update, context, text)
-            elif context.user_data.get('expecting_2fa'):
-                await self.process_2fa_input(update, context, text)
-            elif context.user_data.get('expecting_admin_id'):
-                await self.process_admin_id_input(update, context, text)
+            # Dispatch on the input state; handlers set it again if they need a retry
+            handler = self._input_handlers.get(context.user_data.pop('state', None))
+            if handler:
+                await handler(update, context, text)
             
         except Exception as e:
-            logger.error(f"Error in handle_message: {e}")
+            logger.error("Error in handle_message", exc_info=e)
     
     async def process_phone_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, phone: str):
         """Process phone number input"""
+        ud = context.user_data
         try:
-            context.user_data['expecting_phone'] = False
-            
             # Validate phone number
             phone = phone.strip()
-            if not phone.startswith('+') or not phone[1:].replace(' ', '').isdigit():
+            if not PHONE_RE.match(phone):
                 await update.message.reply_text(
-                    "❌ **Invalid phone number format**\n"
-                    "Please use format: `+1234567890`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    INVALID_PHONE,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
             # Clean phone number
-            phone = phone.replace(' ', '').replace('-', '')
+            phone = PHONE_SEPARATORS_RE.sub('', phone)
             
-            msg = await update.message.reply_text("📱 Connecting to Telegram...")
+            msg = await update.message.reply_text(CONNECTING)
             
+            client = None
             try:
-                # Create Telethon client
-                client = TelegramClient(StringSession(), API_ID, API_HASH)
-                await client.connect()
-                
-                # Send code request
-                await client.send_code_request(phone)
+                # Queue behind other session generations to avoid FloodWait errors
+                async with SESSION_SEMAPHORE:
+                    # Take an already connected Telethon client
+                    client = await self._get_client()
+                    self._active_clients.add(client)
+                    
+                    # Send code request
+                    await telethon_call_with_flood_retry(lambda: client.send_code_request(phone))
                 
                 # Store client temporarily
-                context.user_data['temp_client'] = client
-                context.user_data['phone'] = phone
+                ud['temp_client'] = client
+                ud['phone'] = phone
                 
                 await msg.edit_text(
-                    "📨 **SMS Code sent!**\n\n"
-                    "Please enter the code with spaces between digits.\n"
-                    "**Example:** If code is 46949, send: `4 6 9 4 9`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("❌ Cancel", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    CODE_SENT,
+                    reply_markup=CANCEL_KB,
+                    parse_mode='MarkdownV2'
                 )
                 
-                context.user_data['expecting_code'] = True
+                ud['state'] = InputState.CODE
                 
             except Exception as e:
+                # No login will follow, so don't keep the client around
+                if client:
+                    self._active_clients.discard(client)
+                    self._spawn(client.disconnect())
                 await msg.edit_text(
-                    f"❌ **Error sending code:** `{str(e)}`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    SEND_CODE_ERROR_TPL.format_map({'error': esc_code(e)}),
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 
         except Exception as e:
-            logger.error(f"Error in process_phone_input: {e}")
+            logger.error("Error in process_phone_input", exc_info=e)
     
     async def process_code_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, code: str):
         """Process SMS code input"""
+        ud = context.user_data
         try:
-            context.user_data['expecting_code'] = False
-            
             # Clean and validate code
             code = code.replace(' ', '').strip()
-            if not code.isdigit():
+            if not CODE_RE.match(code):
                 await update.message.reply_text(
-                    "❌ **Invalid code format**\n"
-                    "Please enter digits only with spaces.\n"
-                    "**Example:** `4 6 9 4 9`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    INVALID_CODE_FORMAT,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
-                context.user_data['expecting_code'] = True
+                ud['state'] = InputState.CODE
                 return
             
-            client = context.user_data.get('temp_client')
-            phone = context.user_data.get('phone')
+            client = ud.get('temp_client')
+            phone = ud.get('phone')
             
             if not client or not phone:
                 await update.message.reply_text(
-                    "❌ **Session expired.** Please start again.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    SESSION_EXPIRED,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
-            msg = await update.message.reply_text("🔐 Authenticating...")
+            msg = await update.message.reply_text(AUTHENTICATING)
             
             try:
                 # Sign in with code
-                await client.sign_in(phone, code)
+                result = await telethon_call_with_flood_retry(lambda: client.sign_in(phone, code))
                 
                 # Check if logged in successfully
-                if await client.is_user_authorized():
+                if await telethon_call_with_flood_retry(client.is_user_authorized):
+                    # sign_in already returned the account; keep it so get_me isn't needed
+                    if isinstance(result, User):
+                        ud['me'] = result
                     await self.complete_session_generation(update, context, client, phone, msg)
                 else:
                     await msg.edit_text(
-                        "❌ **Authentication failed.** Please try again.",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                        ]]),
-                        parse_mode='Markdown'
+                        AUTH_FAILED,
+                        reply_markup=BACK_TO_MAIN_KB,
+                        parse_mode='MarkdownV2'
                     )
                 
             except SessionPasswordNeededError:
                 # 2FA required
                 await msg.edit_text(
-                    "🔐 **2FA Password Required**\n\n"
-                    "Please enter your 2FA password:",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("❌ Cancel", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    TFA_REQUIRED,
+                    reply_markup=CANCEL_KB,
+                    parse_mode='MarkdownV2'
                 )
-                context.user_data['expecting_2fa'] = True
+                ud['state'] = InputState.TFA
                 
             except PhoneCodeInvalidError:
                 await msg.edit_text(
-                    "❌ **Invalid verification code**\n"
-                    "Please enter the correct code with spaces.\n"
-                    "**Example:** `4 6 9 4 9`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    INVALID_CODE,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
-                context.user_data['expecting_code'] = True
+                ud['state'] = InputState.CODE
                 
         except Exception as e:
-            logger.error(f"Error in process_code_input: {e}")
+            logger.error("Error in process_code_input", exc_info=e)
     
     async def process_2fa_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, password: str):
         """Process 2FA password input"""
+        ud = context.user_data
         try:
-            context.user_data['expecting_2fa'] = False
-            
-            client = context.user_data.get('temp_client')
-            phone = context.user_data.get('phone')
+            client = ud.get('temp_client')
+            phone = ud.get('phone')
             
             if not client or not phone:
                 await update.message.reply_text(
-                    "❌ **Session expired.** Please start again.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    SESSION_EXPIRED,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
-            msg = await update.message.reply_text("🔐 Verifying 2FA...")
+            msg = await update.message.reply_text(VERIFYING_2FA)
             
             try:
                 # Sign in with 2FA password
-                await client.sign_in(password=password)
+                result = await telethon_call_with_flood_retry(lambda: client.sign_in(password=password))
                 
-                if await client.is_user_authorized():
+                if await telethon_call_with_flood_retry(client.is_user_authorized):
+                    if isinstance(result, User):
+                        ud['me'] = result
                     await self.complete_session_generation(update, context, client, phone, msg)
                 else:
                     await msg.edit_text(
-                        "❌ **Authentication failed.** Please try again.",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                        ]]),
-                        parse_mode='Markdown'
+                        AUTH_FAILED,
+                        reply_markup=BACK_TO_MAIN_KB,
+                        parse_mode='MarkdownV2'
                     )
                 
             except PasswordHashInvalidError:
                 await msg.edit_text(
-                    "❌ **Invalid 2FA password**\n"
-                    "Please enter the correct password:",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("❌ Cancel", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    INVALID_2FA,
+                    reply_markup=CANCEL_KB,
+                    parse_mode='MarkdownV2'
                 )
-                context.user_data['expecting_2fa'] = True
+                ud['state'] = InputState.TFA
                 
         except Exception as e:
-            logger.error(f"Error in process_2fa_input: {e}")
+            logger.error("Error in process_2fa_input", exc_info=e)
     
     async def process_admin_id_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
         """Process admin ID input - Fixed forward_from error"""
         try:
-            context.user_data['expecting_admin_id'] = False
-            
             # Extract user ID - Fixed approach for forward_from
             new_admin_id = None
             username = None
             first_name = None
             
-            # Check for forwarded message (multiple approaches for compatibility)
-            if hasattr(update.message, 'forward_from') and update.message.forward_from:
-                # Old format forwarded message
-                new_admin_id = update.message.forward_from.id
-                username = getattr(update.message.forward_from, 'username', None)
-                first_name = getattr(update.message.forward_from, 'first_name', None)
-            elif hasattr(update.message, 'forward_origin') and update.message.forward_origin:
-                # New format forwarded message
-                if hasattr(update.message.forward_origin, 'sender_user') and update.message.forward_origin.sender_user:
-                    sender = update.message.forward_origin.sender_user
-                    new_admin_id = sender.id
-                    username = getattr(sender, 'username', None)
-                    first_name = getattr(sender, 'first_name', None)
-            else:
+            # Forwarded message: forward_from on older Bot API versions, forward_origin on newer ones
+            msg = update.message
+            origin = getattr(msg, 'forward_origin', None)
+            sender = getattr(msg, 'forward_from', None) or getattr(origin, 'sender_user', None)
+            if sender is not None:
+                new_admin_id = sender.id
+                username = getattr(sender, 'username', None)
+                first_name = getattr(sender, 'first_name', None)
+            elif origin is None:
                 # Direct ID input
                 try:
                     new_admin_id = int(text.strip())
-                    username = None
-                    first_name = None
                 except ValueError:
                     await update.message.reply_text(
-                        "❌ **Invalid user ID format**\n"
-                        "Please send a valid user ID or forward a message.",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                        ]]),
-                        parse_mode='Markdown'
+                        INVALID_USER_ID,
+                        reply_markup=BACK_TO_MAIN_KB,
+                        parse_mode='MarkdownV2'
                     )
                     return
             
             if not new_admin_id:
                 await update.message.reply_text(
-                    "❌ **Could not extract user ID**\n"
-                    "Please send a valid user ID or forward a message.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    NO_USER_ID,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
             # Check if already admin
             if self.db.is_admin(new_admin_id):
                 await update.message.reply_text(
-                    "❌ **User is already an admin**",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    ALREADY_ADMIN,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 return
             
             # Add admin
-            success = self.db.add_admin(new_admin_id, username, first_name, update.effective_user.id)
+            success = await asyncio.to_thread(self.db.add_admin, new_admin_id, username, first_name, update.effective_user.id)
             
             if success:
                 await update.message.reply_text(
-                    f"✅ **Admin added successfully!**\n"
-                    f"User ID: `{new_admin_id}`\n"
-                    f"Name: **{first_name or 'Unknown'}**\n"
-                    f"Username: @{username or 'None'}",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    ADMIN_ADDED_TPL.format_map({
+                        'uid': new_admin_id,
+                        'name': esc(first_name or 'Unknown'),
+                        'user': esc(username or 'None')
+                    }),
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
-                logger.info(f"Admin {new_admin_id} added by {update.effective_user.id}")
+                logger.info("Admin %s added by %s", new_admin_id, update.effective_user.id)
             else:
                 await update.message.reply_text(
-                    "❌ **Failed to add admin**",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    ADD_ADMIN_FAILED,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 
         except Exception as e:
-            logger.error(f"Error in process_admin_id_input: {e}")
+            logger.error("Error in process_admin_id_input", exc_info=e)
     
     async def complete_session_generation(self, update: Update, context: ContextTypes.DEFAULT_TYPE, client, phone: str, status_msg):
         """Complete session generation and send backups"""
+        ud = context.user_data
         try:
             # Get session string
             session_string = client.session.save()
             
-            # Get user info
-            me = await client.get_me()
+            # Get user info, reusing the account returned by sign_in when there is one
+            me = ud.pop('me', None) or await telethon_call_with_flood_retry(client.get_me)
             account_name = f"{me.first_name or ''} {me.last_name or ''}".strip()
             if not account_name:
                 account_name = me.username or "Unknown"
             
-            # Clean up temporary client
-            await client.disconnect()
-            context.user_data.pop('temp_client', None)
+            # Clean up temporary client in the background; nothing waits on it
+            self._active_clients.discard(client)
+            self._spawn(client.disconnect())
+            ud.pop('temp_client', None)
             
             # Save to database
-            success = self.db.save_session(session_string, phone, account_name, update.effective_user.id)
+            success = await asyncio.to_thread(self.db.save_session, session_string, phone, account_name, update.effective_user.id)
             
             if success:
                 # Send session to current user
-                session_message = (
-                    f"✅ **Session Generated Successfully!**\n\n"
-                    f"📱 **Account:** {account_name}\n"
-                    f"📞 **Phone:** {phone}\n\n"
-                    f"🔑 **Session String:**\n"
-                    f"`{session_string}`\n\n"
-                    f"⚠️ **Copy the session!**\n"
-                    f"✅️**Success.**"
-                )
-                
-                await status_msg.edit_text(
-                    session_message,
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
-                )
+                fields = {
+                    'account': esc(account_name),
+                    'phone': esc(phone),
+                    'session': esc_code(session_string),
+                    'date': esc(update.message.date)
+                }
+                session_message = SESSION_GENERATED_TPL.format_map(fields)
                 
                 # **MAIN FEATURE: Send backup to main admin account (YOUR account)**
-                if update.effective_user.id != MAIN_ADMIN_ID:
+                is_main_admin = update.effective_user.id == self.MAIN
+                if not is_main_admin:
                     # Only send backup if this isn't the main admin generating for themselves
-                    try:
-                        backup_message = (
-                            f"🔐 **Session Backup Alert**\n\n"
-                            f"📱 **Account:** {account_name}\n"
-                            f"📞 **Phone:** {phone}\n"
-                            f"👤 **Generated by:** {update.effective_user.first_name or 'Unknown'} "
-                            f"({update.effective_user.id})\n"
-                            f"📅 **Time:** {update.message.date}\n\n"
-                            f"🔑 **Session String:**\n"
-                            f"`{session_string}`\n\n"
-                            f"⚡ **Auto-backup from Session Generator Bot**"
-                        )
-                        
-                        await context.bot.send_message(
-                            chat_id=MAIN_ADMIN_ID,
-                            text=backup_message,
-                            parse_mode='Markdown'
-                        )
-                        
-                        logger.info(f"Session backup sent to main admin for {phone} generated by user {update.effective_user.id}")
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to send backup to main admin: {e}")
+                    backup_message = BACKUP_TPL.format_map({
+                        **fields,
+                        'generated_by': esc(update.effective_user.first_name or 'Unknown'),
+                        'generated_by_id': update.effective_user.id
+                    })
                 else:
                     # If main admin generates session, just send to saved messages
-                    try:
-                        self_backup_message = (
-                            f"🔐 **Self-Generated Session**\n\n"
-                            f"📱 **Account:** {account_name}\n"
-                            f"📞 **Phone:** {phone}\n"
-                            f"📅 **Generated:** {update.message.date}\n\n"
-                            f"🔑 **Session String:**\n"
-                            f"`{session_string}`"
-                        )
-                        
-                        await context.bot.send_message(
-                            chat_id=MAIN_ADMIN_ID,
-                            text=self_backup_message,
-                            parse_mode='Markdown'
-                        )
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to send self-backup: {e}")
+                    backup_message = SELF_BACKUP_TPL.format_map(fields)
                 
-                logger.info(f"Session generated for {phone} by user {update.effective_user.id}")
+                # The reply and the backup are independent, so send them concurrently
+                reply_result, backup_result = await asyncio.gather(
+                    status_msg.edit_text(
+                        session_message,
+                        reply_markup=BACK_TO_MAIN_KB,
+                        parse_mode='MarkdownV2'
+                    ),
+                    context.bot.send_message(
+                        chat_id=self.MAIN,
+                        text=backup_message,
+                        parse_mode='MarkdownV2'
+                    ),
+                    return_exceptions=True
+                )
+                
+                if isinstance(backup_result, Exception):
+                    if is_main_admin:
+                        logger.warning("Failed to send self-backup: %s", backup_result)
+                    else:
+                        logger.warning("Failed to send backup to main admin: %s", backup_result)
+                elif not is_main_admin:
+                    logger.info("Session backup sent to main admin for %s generated by user %s", phone, update.effective_user.id)
+                
+                if isinstance(reply_result, Exception):
+                    raise reply_result
+                
+                logger.info("Session generated for %s by user %s", phone, update.effective_user.id)
                 
             else:
                 await status_msg.edit_text(
-                    "❌ **Failed to save session to database**",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    SAVE_SESSION_FAILED,
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
                 
         except Exception as e:
-            logger.error(f"Error in complete_session_generation: {e}")
+            logger.error("Error in complete_session_generation", exc_info=e)
             try:
                 await status_msg.edit_text(
-                    f"❌ **Error generating session:** `{str(e)}`",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Back to Main", callback_data="back_to_main")
-                    ]]),
-                    parse_mode='Markdown'
+                    SESSION_ERROR_TPL.format_map({'error': esc_code(e)}),
+                    reply_markup=BACK_TO_MAIN_KB,
+                    parse_mode='MarkdownV2'
                 )
             except:
                 pass
     
-    async def shutdown_handler(self, signum, frame):
-        """Handle shutdown signals"""
+    def _shutdown(self):
+        """Handle shutdown signals by letting run() fall through to its cleanup"""
         logger.info("Shutdown signal received")
-        if self.application:
-            await self.application.stop()
-            await self.application.shutdown()
-        
-        # Close any remaining Telethon clients
-        for client in getattr(self, 'temp_clients', {}).values():
-            try:
-                if client and client.is_connected():
-                    await client.disconnect()
-            except:
-                pass
-        
-        sys.exit(0)
+        self._stop_event.set()
+    
+    async def _disconnect_active_clients(self):
+        """Disconnect every Telethon client still waiting on a login"""
+        clients = list(self._active_clients)
+        self._active_clients.clear()
+        await asyncio.gather(
+            *(client.disconnect() for client in clients if client.is_connected()),
+            return_exceptions=True
+        )
     
     async def run(self):
         """Run the bot with proper event loop management"""
         try:
             logger.info("Starting Session Generator Bot...")
             
-            # Setup signal handlers
-            signal.signal(signal.SIGINT, lambda s, f: asyncio.create_task(self.shutdown_handler(s, f)))
-            signal.signal(signal.SIGTERM, lambda s, f: asyncio.create_task(self.shutdown_handler(s, f)))
+            # Setup signal handlers on the loop so shutdown runs as ordinary loop code
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, self._shutdown)
+                except NotImplementedError:
+                    # Windows event loops have no signal handlers; Ctrl+C still raises KeyboardInterrupt
+                    pass
             
             # Initialize and run application
             await self.application.initialize()
             await self.application.start()
-            await self.application.updater.start_polling()
+            if WEBHOOK_URL:
+                # Telegram pushes updates to us; no polling round-trips
+                await self.application.updater.start_webhook(
+                    listen=WEBHOOK_LISTEN,
+                    port=WEBHOOK_PORT,
+                    url_path=BOT_TOKEN,
+                    webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{BOT_TOKEN}"
+                )
+            else:
+                await self.application.updater.start_polling()
+            
+            # Pay the MTProto handshake up front rather than on the first login
+            for _ in range(CLIENT_POOL_SIZE):
+                self._spawn(self._refill_client_pool())
+            self._spawn(self._refresh_admins_periodically())
             
             logger.info("Session Generator Bot is running...")
             
             # Keep running until shutdown
-            await asyncio.Event().wait()
+            await self._stop_event.wait()
             
         except Exception as e:
-            logger.error(f"Error running bot: {e}")
+            logger.error("Error running bot", exc_info=e)
         finally:
-            # Cleanup
+            # Cleanup; stop refills first so none can fill the pool after it is drained
+            self._stop_event.set()
+            await self._cancel_background_tasks()
+            await self._disconnect_active_clients()
+            await self._drain_client_pool()
             if self.application:
                 try:
                     await self.application.updater.stop()
@@ -873,6 +1227,10 @@ class SessionGeneratorBot:
 # ====================================
 def main():
     """Main function with proper async handling"""
+    missing = [name for name in REQUIRED_SETTINGS if not os.environ.get(name)]
+    if missing:
+        raise SystemExit(f"❌ Missing required environment variables: {', '.join(missing)}")
+    
     try:
         # Check if event loop is already running
         try:
@@ -886,7 +1244,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error", exc_info=e)
 
 async def run_bot():
     """Async function to run the bot"""